@@ -4,14 +4,100 @@ Handles patch blocks with Update, Add, and Delete actions following the
 V4A-Compatible format specification.
 """
 
+import functools
 import os
 import re
-from typing import List, Tuple, Optional, Dict, Any
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
 
+# Hunk line prefixes: context, removal and addition
+_HUNK_PREFIXES = {' ': ' ', '-': '-', '+': '+'}
 
-class PatchBlock:
+# Patch marker lines inside a block: an action line (group 1 is the action,
+# group 2 the file path) or the block terminator
+_MARKER_RE = re.compile(r'\*\*\* (?:(Update|Add|Delete) File:(.*)|End Patch$)')
+
+# Parser states: outside any block, inside a block before its action line,
+# inside the body of an Update, Add or Delete block, inside an Update hunk
+_TOPLEVEL = 0
+_IN_BLOCK = 1
+_IN_UPDATE = 2
+_IN_ADD = 3
+_IN_DELETE = 4
+_IN_HUNK = 5
+
+# Body state entered after each action line
+_ACTION_STATES = {'Update': _IN_UPDATE, 'Add': _IN_ADD, 'Delete': _IN_DELETE}
+
+
+def _prefix_run_end(prefixes: str, start: int, chars: str) -> int:
+    """Return the index where a run of the given prefix characters ends.
+    
+    Args:
+        prefixes: Prefix string of a hunk.
+        start: Index the run starts at.
+        chars: Prefix characters belonging to the run.
+        
+    Returns:
+        Index of the first prefix from start on that is not in chars.
+    """
+    rest = prefixes[start:]
+    return start + len(rest) - len(rest.lstrip(chars))
+
+
+class _Record:
+    """Base for parsed patch records with fixed attributes.
+    
+    Attributes can also be read by name with subscripting, matching the
+    dictionaries earlier versions of the parser returned.
+    """
+    
+    __slots__ = ()
+    
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+
+class Hunk(_Record):
+    """Represents a single hunk of an Update block.
+    
+    Hunk lines are stored as a string of one-character prefixes and a
+    parallel list of line texts, rather than as (prefix, line) tuples.
+    """
+    
+    __slots__ = ('header', 'prefixes', 'texts')
+    
+    def __init__(self, header: str, prefixes: str = '',
+                 texts: Optional[List[str]] = None):
+        """Initialize a hunk.
+        
+        Args:
+            header: The hunk header line (context line from original).
+            prefixes: The prefix (' ', '-' or '+') of each hunk line.
+            texts: The hunk lines without their prefixes.
+        """
+        self.header = header
+        self.prefixes = prefixes
+        self.texts: List[str] = [] if texts is None else texts
+    
+    @property
+    def lines(self) -> List[Tuple[str, str]]:
+        """The hunk lines as (prefix, line) tuples."""
+        return list(zip(self.prefixes, self.texts))
+    
+    def copy(self) -> 'Hunk':
+        """Return a copy of the hunk that does not share its line list."""
+        return Hunk(self.header, self.prefixes, list(self.texts))
+
+
+class PatchBlock(_Record):
     """Represents a single patch block with action, file path, and content."""
     
+    __slots__ = ('action', 'file_path', 'hunks', 'content')
+    
     def __init__(self, action: str, file_path: str):
         """Initialize a patch block.
         
@@ -21,7 +107,7 @@ class PatchBlock:
         """
         self.action = action
         self.file_path = file_path
-        self.hunks: List[Dict[str, Any]] = []
+        self.hunks: List[Hunk] = []
         self.content: List[str] = []
     
     def add_hunk(self, header: str, lines: List[Tuple[str, str]]):
@@ -31,10 +117,11 @@ class PatchBlock:
             header: The hunk header line (context line from original).
             lines: List of (prefix, line) tuples.
         """
-        self.hunks.append({
-            'header': header,
-            'lines': lines
-        })
+        self.hunks.append(Hunk(
+            header,
+            ''.join(prefix for prefix, _ in lines),
+            [line for _, line in lines]
+        ))
     
     def add_content_line(self, line: str):
         """Add a content line for Add action.
@@ -43,6 +130,189 @@ class PatchBlock:
             line: The line to add (without prefix).
         """
         self.content.append(line)
+    
+    def copy(self) -> 'PatchBlock':
+        """Return a copy of the block that does not share its lists."""
+        block = PatchBlock(self.action, self.file_path)
+        block.hunks = [hunk.copy() for hunk in self.hunks]
+        block.content = list(self.content)
+        return block
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_patch_cached(patch_text: str) -> Tuple[PatchBlock, ...]:
+    """Parse V4A-Compatible patch text, memoizing recent results.
+    
+    The returned blocks are shared between calls and must not be modified;
+    PatchApplier.parse_patch hands out copies, while apply_patch, which only
+    reads them, uses them directly.
+    
+    Args:
+        patch_text: The patch text in V4A-Compatible format.
+    
+    Returns:
+        Tuple of parsed patch blocks.
+    """
+    if not patch_text.strip():
+        return ()
+    
+    blocks = []
+    block: Optional[PatchBlock] = None
+    block_hunks: List[Hunk] = []
+    block_content: List[str] = []
+    hunk = Hunk('')
+    hunk_prefixes: List[str] = []
+    add_prefix = hunk_prefixes.append
+    add_text = hunk.texts.append
+    prefix_of = _HUNK_PREFIXES.get
+    state = _TOPLEVEL
+    
+    for line in patch_text.split('\n'):
+        if state == _IN_HUNK:
+            # Hunk body; anything that is not a prefixed line (a blank
+            # line, the next '@@' header, a patch marker) ends the hunk.
+            # The substring test spares stripping every line to rule out
+            # an indented End Patch.
+            prefix = prefix_of(line[:1])
+            if prefix is not None and (
+                '*** End Patch' not in line or line.strip() != '*** End Patch'
+            ):
+                add_prefix(prefix)
+                add_text(line[1:])
+                continue
+            hunk.prefixes = ''.join(hunk_prefixes)
+            state = _IN_UPDATE
+        
+        stripped = line.strip()
+        if state == _TOPLEVEL:
+            # Look for patch block start
+            if stripped == '*** Begin Patch':
+                state = _IN_BLOCK
+            continue
+        
+        # Only lines starting with '***' can be markers
+        marker = _MARKER_RE.match(stripped) if stripped[:3] == '***' else None
+        
+        if marker is not None and marker.group(1) is None:
+            # End of block
+            if block is not None:
+                blocks.append(block)
+            block = None
+            state = _TOPLEVEL
+        elif state == _IN_UPDATE:
+            if line.startswith('@@'):
+                # Extract header (context line)
+                hunk = Hunk(line[2:].strip())
+                hunk_prefixes = []
+                add_prefix = hunk_prefixes.append
+                add_text = hunk.texts.append
+                block_hunks.append(hunk)
+                state = _IN_HUNK
+        elif state == _IN_ADD:
+            if line.startswith('+'):
+                # Remove only the '+' prefix, preserve all other whitespace
+                block_content.append(line[1:])
+        elif state == _IN_BLOCK:
+            # Find action line
+            if marker is not None:
+                block = PatchBlock(marker.group(1), marker.group(2).strip())
+                block_hunks = block.hunks
+                block_content = block.content
+                state = _ACTION_STATES[block.action]
+    
+    # A block left open at the end of the text is still returned
+    if state == _IN_HUNK:
+        hunk.prefixes = ''.join(hunk_prefixes)
+    if block is not None:
+        blocks.append(block)
+    
+    return tuple(blocks)
+
+
+class _CompiledHunk(NamedTuple):
+    """A hunk preprocessed into the byte strings used to apply it."""
+    
+    # Stripped header line
+    header: bytes
+    # Stripped original lines (context and removals) up to the first addition
+    context_lines: Tuple[bytes, ...]
+    # Whether the header is the first leading context line
+    header_first: bool
+    # Number of leading context lines
+    context_before_count: int
+    # Number of file lines the hunk replaces
+    replaced_count: int
+    # Lines replacing them, each terminated with b'\n'
+    replacement: Tuple[bytes, ...]
+
+
+class _HunkRegion(NamedTuple):
+    """Where a hunk applies to the current lines and what replaces them."""
+    
+    # Stripped header line
+    header: bytes
+    # Whether the hunk was located by its context instead of its header
+    by_context: bool
+    # Index after the header line or context lines the hunk was located by
+    match_end: int
+    # Range of lines the hunk replaces
+    start: int
+    end: int
+    # Lines replacing them, terminated with the file's newline
+    replacement: List[bytes]
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_hunk(header: str, prefixes: str, texts: Tuple[str, ...]) -> _CompiledHunk:
+    """Preprocess a hunk for application, memoizing recent results.
+    
+    Hunks from repeated patch text share their strings, so re-applying a
+    patch reuses the encoded lines instead of rebuilding them.
+    
+    Args:
+        header: The hunk header line.
+        prefixes: The prefix (' ', '-' or '+') of each hunk line.
+        texts: The hunk lines without their prefixes.
+        
+    Returns:
+        The compiled hunk.
+    """
+    # Hunk text is compared and written as UTF-8 bytes. Lines of a patch
+    # with CRLF line endings keep their '\r', which is dropped so that
+    # only the file's own line terminator is added back.
+    header_bytes = header.encode('utf-8').strip()
+    lines = [text.encode('utf-8') for text in texts]
+    lines = [line[:-1] if line.endswith(b'\r') else line for line in lines]
+    
+    # Split the hunk into its leading context, the run of changes
+    # (removals and additions) and the trailing context; anything
+    # after the trailing context is ignored
+    changes_start = _prefix_run_end(prefixes, 0, ' ')
+    changes_end = _prefix_run_end(prefixes, changes_start, '-+')
+    after_end = _prefix_run_end(prefixes, changes_end, ' ')
+    
+    context_before = lines[:changes_start]
+    context_after = lines[changes_end:after_end]
+    
+    # Count and collect the changes with C-level string operations on
+    # the prefixes; only interleaved removals and additions need a
+    # per-line check
+    removal_count = prefixes.count('-', changes_start, changes_end)
+    additions_start = changes_start + removal_count
+    if prefixes.count('+', additions_start, changes_end) == changes_end - additions_start:
+        additions = lines[additions_start:changes_end]
+    else:
+        additions = [lines[i] for i in range(changes_start, changes_end)
+                     if prefixes[i] == '+']
+    
+    return _CompiledHunk(
+        header=header_bytes,
+        context_lines=tuple(map(bytes.strip, lines[:_prefix_run_end(prefixes, 0, ' -')])),
+        header_first=bool(context_before) and context_before[0].strip() == header_bytes,
+        context_before_count=len(context_before),
+        replaced_count=len(context_before) + removal_count + len(context_after),
+        replacement=tuple(line + b'\n' for line in context_before + additions + context_after),
+    )
 
 
 class PatchApplier:
@@ -52,176 +322,19 @@ class PatchApplier:
         """Initialize the patch applier."""
         self.blocks: List[PatchBlock] = []
     
-    def parse_patch(self, patch_text: str) -> List[Dict[str, Any]]:
+    def parse_patch(self, patch_text: str) -> List[PatchBlock]:
         """Parse V4A-Compatible patch format into structured blocks.
         
+        Parsing results are cached, so retrying or re-applying the same
+        patch text does not parse it again.
+        
         Args:
             patch_text: The patch text in V4A-Compatible format.
             
         Returns:
             List of patch blocks with action, file path, and content.
         """
-        if not patch_text.strip():
-            return []
-        
-        blocks = []
-        lines = patch_text.split('\n')
-        i = 0
-        
-        while i < len(lines):
-            # Look for patch block start
-            if lines[i].strip() == '*** Begin Patch':
-                i += 1
-                block = self._parse_block(lines, i)
-                if block:
-                    blocks.append(block)
-                    i = block['end_index'] + 1
-                else:
-                    i += 1
-            else:
-                i += 1
-        
-        return blocks
-    
-    def _parse_block(self, lines: List[str], start_idx: int) -> Optional[Dict[str, Any]]:
-        """Parse a single patch block.
-        
-        Args:
-            lines: All lines of the patch.
-            start_idx: Starting index for this block.
-            
-        Returns:
-            Dictionary representing the patch block or None if invalid.
-        """
-        i = start_idx
-        
-        # Find action line
-        while i < len(lines):
-            line = lines[i].strip()
-            if line.startswith('*** Update File:'):
-                action = 'Update'
-                file_path = line[len('*** Update File:'):].strip()
-                break
-            elif line.startswith('*** Add File:'):
-                action = 'Add'
-                file_path = line[len('*** Add File:'):].strip()
-                break
-            elif line.startswith('*** Delete File:'):
-                action = 'Delete'
-                file_path = line[len('*** Delete File:'):].strip()
-                break
-            elif line == '*** End Patch':
-                return None
-            i += 1
-        else:
-            return None
-        
-        i += 1
-        
-        # Parse content based on action
-        if action == 'Delete':
-            # Delete has no content, just find end
-            while i < len(lines) and lines[i].strip() != '*** End Patch':
-                i += 1
-            return {
-                'action': action,
-                'file_path': file_path,
-                'hunks': [],
-                'content': [],
-                'end_index': i
-            }
-        elif action == 'Add':
-            # Parse Add content - preserve all whitespace after the '+'
-            content = []
-            while i < len(lines) and lines[i].strip() != '*** End Patch':
-                if lines[i].startswith('+'):
-                    # Remove only the '+' prefix, preserve all other whitespace
-                    content.append(lines[i][1:])
-                i += 1
-            return {
-                'action': action,
-                'file_path': file_path,
-                'hunks': [],
-                'content': content,
-                'end_index': i
-            }
-        else:  # Update
-            # Parse Update hunks
-            hunks = []
-            while i < len(lines) and lines[i].strip() != '*** End Patch':
-                if lines[i].startswith('@@'):
-                    hunk = self._parse_hunk(lines, i)
-                    if hunk:
-                        hunks.append(hunk)
-                        i = hunk['end_index'] + 1
-                    else:
-                        i += 1
-                else:
-                    i += 1
-            
-            return {
-                'action': action,
-                'file_path': file_path,
-                'hunks': hunks,
-                'content': [],
-                'end_index': i
-            }
-    
-    def _parse_hunk(self, lines: List[str], start_idx: int) -> Optional[Dict[str, Any]]:
-        """Parse a single hunk in an Update block.
-        
-        Args:
-            lines: All lines of the patch.
-            start_idx: Starting index for this hunk.
-            
-        Returns:
-            Dictionary representing the hunk or None if invalid.
-        """
-        if not lines[start_idx].startswith('@@'):
-            return None
-        
-        # Extract header (context line)
-        header = lines[start_idx][2:].strip()
-        
-        i = start_idx + 1
-        hunk_lines = []
-        
-        # Parse hunk lines
-        while i < len(lines):
-            line = lines[i]
-            
-            # Check for end conditions
-            if line.strip() == '*** End Patch':
-                break
-            if line.startswith('@@'):
-                # Start of next hunk - don't include this line
-                break
-            
-            # Parse line based on prefix
-            if line.startswith(' '):
-                # Context line
-                hunk_lines.append((' ', line[1:]))
-                i += 1
-            elif line.startswith('-'):
-                # Removed line
-                hunk_lines.append(('-', line[1:]))
-                i += 1
-            elif line.startswith('+'):
-                # Added line
-                hunk_lines.append(('+', line[1:]))
-                i += 1
-            elif line.strip() == '':
-                # Empty line between hunks - stop here
-                break
-            else:
-                # Unknown line format - stop here
-                break
-        
-        return {
-            'header': header,
-            'lines': hunk_lines,
-            'end_index': i - 1
-        }
+        return [block.copy() for block in _parse_patch_cached(patch_text)]
     
     def apply_patch(self, patch_text: str, base_dir: str = ".") -> List[Tuple[str, bool, str]]:
         """Apply a V4A-Compatible patch to files.
@@ -233,33 +346,34 @@ class PatchApplier:
         Returns:
             List of (file_path, success, message) tuples.
         """
-        blocks = self.parse_patch(patch_text)
+        # Blocks are only read here, so the shared cached ones are used as-is
+        blocks = _parse_patch_cached(patch_text)
         results = []
         
         for block in blocks:
-            file_path = os.path.join(base_dir, block['file_path'])
+            file_path = os.path.join(base_dir, block.file_path)
             
             try:
-                if block['action'] == 'Update':
-                    success = self._apply_update(file_path, block['hunks'])
+                if block.action == 'Update':
+                    success = self._apply_update(file_path, block.hunks)
                     message = "Updated successfully" if success else "Failed to apply update"
-                elif block['action'] == 'Add':
-                    success = self._apply_add(file_path, block['content'])
+                elif block.action == 'Add':
+                    success = self._apply_add(file_path, block.content)
                     message = "Added successfully" if success else "Failed to add file"
-                elif block['action'] == 'Delete':
+                elif block.action == 'Delete':
                     success = self._apply_delete(file_path)
                     message = "Deleted successfully" if success else "Failed to delete file"
                 else:
                     success = False
-                    message = f"Unknown action: {block['action']}"
+                    message = f"Unknown action: {block.action}"
                 
-                results.append((block['file_path'], success, message))
+                results.append((block.file_path, success, message))
             except Exception as e:
-                results.append((block['file_path'], False, str(e)))
+                results.append((block.file_path, False, str(e)))
         
         return results
     
-    def _apply_update(self, file_path: str, hunks: List[Dict[str, Any]]) -> bool:
+    def _apply_update(self, file_path: str, hunks: List[Hunk]) -> bool:
         """Apply update hunks to an existing file.
         
         Args:
@@ -269,136 +383,280 @@ class PatchApplier:
         Returns:
             True if successful, False otherwise.
         """
-        if not os.path.exists(file_path):
+        try:
+            f = open(file_path, 'r+b')
+        except OSError:
+            # Including FileNotFoundError for a missing file
             return False
         
         try:
-            # Read file content
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            lines = content.split('\n')
-            
-            # Apply hunks in reverse order to maintain line numbers
-            for hunk in reversed(hunks):
-                lines = self._apply_hunk_to_lines(lines, hunk)
-                if lines is None:
+            with f:
+                # Read file lines as bytes, keeping their original terminators
+                lines = f.read().splitlines(keepends=True)
+                
+                newline = b'\n'
+                if lines:
+                    first = lines[0]
+                    newline = first[len(first.rstrip(b'\r\n')):] or b'\n'
+                
+                # Hunks match the text between line breaks, so a file that
+                # is empty or ends with a line break has an empty last line,
+                # which hunks can match and insert after. An unterminated
+                # last line is terminated while hunks are applied instead,
+                # so inserted lines can't run into it.
+                if lines and not lines[-1].endswith((b'\n', b'\r')):
+                    lines[-1] += newline
+                else:
+                    lines.append(b'')
+                
+                new_lines = self._apply_hunks(lines, hunks, newline)
+                if new_lines is None:
                     return False
-            
-            # Write updated content back
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(lines))
+                lines = new_lines
+                
+                # Unless the empty line (the only empty element) is still
+                # last, it is followed by other lines and becomes a line
+                # break, while the line now last loses its line break
+                if lines and lines[-1]:
+                    if b'' in lines:
+                        lines[lines.index(b'')] = newline
+                    last = lines[-1]
+                    lines[-1] = last[:-2] if last.endswith(b'\r\n') else last[:-1]
+                
+                # Write updated content back over the original
+                f.seek(0)
+                f.writelines(lines)
+                f.truncate()
             
             return True
         except Exception:
             return False
     
-    def _apply_hunk_to_lines(self, lines: List[str], hunk: Dict[str, Any]) -> Optional[List[str]]:
-        """Apply a single hunk to lines.
+    def _apply_hunks(self, lines: List[bytes], hunks: List[Hunk],
+                     newline: bytes = b'\n') -> Optional[List[bytes]]:
+        """Apply all hunks of an Update block to lines.
         
         Args:
-            lines: Current file lines.
-            hunk: Hunk to apply.
+            lines: Current file lines as bytes, with their line terminators;
+                may be modified.
+            hunks: Hunks to apply, in patch order.
+            newline: Line terminator appended to lines taken from the hunks.
             
         Returns:
             Updated lines or None if failed.
         """
-        header = hunk['header']
-        hunk_lines = hunk['lines']
-        
-        # Find the location to apply the hunk by matching the header line
-        match_idx = -1
-        for i, line in enumerate(lines):
-            if line.strip() == header.strip():
-                match_idx = i
+        # Lines are matched with surrounding whitespace removed; strip each
+        # line once for all hunks instead of on every comparison
+        stripped = list(map(bytes.strip, lines))
+        
+        # Locate every hunk in the original lines. If each one ends before
+        # the next one starts, applying them in reverse order would find the
+        # same positions, so the result can be assembled in a single forward
+        # pass instead of copying the whole file once per hunk.
+        line_index: Optional[Dict[bytes, List[int]]] = None
+        if len(hunks) > 1:
+            # Index the stripped lines once instead of rescanning the whole
+            # file for every hunk
+            line_index = defaultdict(list)
+            for i, line in enumerate(stripped):
+                line_index[line].append(i)
+        
+        regions = []
+        extent = 0
+        context_headers: Set[bytes] = set()
+        for hunk in hunks:
+            region = self._locate_hunk(stripped, hunk, newline, line_index)
+            if region is None or region.start < extent:
+                break
+            # A hunk located by its context would be located by its header
+            # instead once a later hunk adds that header line
+            if context_headers and not context_headers.isdisjoint(
+                    map(bytes.strip, region.replacement)):
                 break
+            if region.by_context:
+                context_headers.add(region.header)
+            regions.append(region)
+            extent = max(region.match_end, region.end)
+        else:
+            new_lines: List[bytes] = []
+            cur = 0
+            for region in regions:
+                new_lines.extend(lines[cur:region.start])
+                new_lines.extend(region.replacement)
+                cur = region.end
+            new_lines.extend(lines[cur:])
+            return new_lines
+        
+        # Otherwise apply hunks in reverse order to maintain line numbers
+        for hunk in reversed(hunks):
+            if not self._apply_hunk_in_place(lines, hunk, newline, stripped):
+                return None
+        return lines
+    
+    def _apply_hunk_in_place(self, lines: List[bytes], hunk: Hunk,
+                             newline: bytes = b'\n',
+                             stripped: Optional[List[bytes]] = None) -> bool:
+        """Apply a single hunk to lines, modifying them in place.
         
+        Args:
+            lines: Current file lines as bytes, with their line terminators.
+            hunk: Hunk to apply.
+            newline: Line terminator appended to lines taken from the hunk.
+            stripped: Optional stripped copy of lines; updated in place to
+                match lines.
+            
+        Returns:
+            True if successful, False if the hunk could not be located.
+        """
+        if stripped is None:
+            stripped = list(map(bytes.strip, lines))
+        
+        region = self._locate_hunk(stripped, hunk, newline)
+        if region is None:
+            return False
+        
+        # Splice the replacement over the matched region
+        lines[region.start:region.end] = region.replacement
+        stripped[region.start:region.end] = map(bytes.strip, region.replacement)
+        
+        return True
+    
+    def _locate_hunk(self, stripped: List[bytes], hunk: Hunk, newline: bytes = b'\n',
+                     line_index: Optional[Dict[bytes, List[int]]] = None
+                     ) -> Optional[_HunkRegion]:
+        """Find the lines a hunk replaces and the lines replacing them.
+        
+        Args:
+            stripped: Current file lines as bytes, stripped of surrounding
+                whitespace.
+            hunk: Hunk to locate.
+            newline: Line terminator appended to lines taken from the hunk.
+            line_index: Optional map of stripped line to the ascending
+                indices it occurs at.
+            
+        Returns:
+            The region the hunk applies to, or None if it could not be
+            located.
+        """
+        compiled = _compile_hunk(hunk.header, hunk.prefixes, tuple(hunk.texts))
+        header = compiled.header
+        
+        # Find the location to apply the hunk by matching the header line
+        header_idx = -1
+        if line_index is not None:
+            header_idx = line_index.get(header, [-1])[0]
+        elif header in stripped:
+            header_idx = stripped.index(header)
+        
+        match_idx = header_idx
+        match_end = header_idx + 1
         if match_idx == -1:
             # Try to find by context matching
-            match_idx = self._find_hunk_location(lines, hunk_lines)
+            if line_index is not None:
+                match_idx = self._find_hunk_location_fast(
+                    stripped, line_index, compiled.context_lines)
+            else:
+                match_idx = self._find_hunk_location(stripped, compiled.context_lines)
             if match_idx == -1:
                 return None
-        
-        # Separate context, removals, and additions
-        context_before = []
-        context_after = []
-        removals = []
-        additions = []
-        
-        # Parse the hunk lines to separate context, removals, and additions
-        i = 0
-        # First pass: collect context before changes
-        while i < len(hunk_lines) and hunk_lines[i][0] == ' ':
-            context_before.append(hunk_lines[i][1])
-            i += 1
-        
-        # Second pass: collect changes (removals and additions)
-        while i < len(hunk_lines) and hunk_lines[i][0] in ['-', '+']:
-            prefix, line = hunk_lines[i]
-            if prefix == '-':
-                removals.append(line)
-            elif prefix == '+':
-                additions.append(line)
-            i += 1
-        
-        # Third pass: collect context after changes
-        while i < len(hunk_lines) and hunk_lines[i][0] == ' ':
-            context_after.append(hunk_lines[i][1])
-            i += 1
+            match_end = match_idx + len(compiled.context_lines)
         
         # Calculate the start position
         # The header line should be the first context line
-        if context_before and context_before[0].strip() == header.strip():
+        if compiled.header_first:
             start_idx = match_idx
         else:
             # Find where the context actually starts
-            start_idx = match_idx - len(context_before) + 1
+            start_idx = match_idx - compiled.context_before_count + 1
             if start_idx < 0:
                 start_idx = 0
         
         # Calculate the end position
-        end_idx = start_idx + len(context_before) + len(removals) + len(context_after)
+        end_idx = start_idx + compiled.replaced_count
         
-        # Build new lines array
-        new_lines = lines[:start_idx]
-        new_lines.extend(context_before)
-        new_lines.extend(additions)
-        new_lines.extend(context_after)
-        new_lines.extend(lines[end_idx:])
+        if newline == b'\n':
+            replacement = list(compiled.replacement)
+        else:
+            replacement = [line[:-1] + newline for line in compiled.replacement]
         
-        return new_lines
+        return _HunkRegion(header, header_idx == -1, match_end,
+                           start_idx, end_idx, replacement)
     
-    def _find_hunk_location(self, lines: List[str], hunk_lines: List[Tuple[str, str]]) -> int:
+    def _find_hunk_location(self, stripped: List[bytes], context_lines: Sequence[bytes]) -> int:
         """Find where to apply a hunk by matching context.
         
         Args:
-            lines: File lines.
-            hunk_lines: Hunk lines with prefixes.
+            stripped: File lines, stripped of surrounding whitespace.
+            context_lines: The hunk's stripped original lines to match.
             
         Returns:
             Index where hunk should be applied or -1 if not found.
         """
-        # Extract context lines for matching
-        context_lines = []
-        for prefix, line in hunk_lines:
-            if prefix == ' ':
-                context_lines.append(line)
-            elif prefix == '-':
-                context_lines.append(line)
-            else:
-                break
+        if not context_lines or len(context_lines) > len(stripped):
+            return -1
+        
+        # No match can start before the first line equal to the first
+        # context line, so skip the lines ahead of it and try it directly
+        try:
+            first = stripped.index(context_lines[0])
+        except ValueError:
+            return -1
+        if stripped[first:first + len(context_lines)] == list(context_lines):
+            return first
+        
+        # Search the remaining lines as one newline-delimited string so the
+        # scan runs inside bytes.find. Stripped lines never contain a
+        # newline, and the delimiters around the needle keep matches on
+        # whole lines.
+        haystack = b'\n' + b'\n'.join(stripped[first + 1:]) + b'\n'
+        needle = b'\n' + b'\n'.join(context_lines) + b'\n'
+        
+        pos = haystack.find(needle)
+        if pos == -1:
+            return -1
         
+        # Each delimiter before the match starts one earlier line
+        return first + 1 + haystack.count(b'\n', 0, pos)
+    
+    def _find_hunk_location_fast(self, stripped: List[bytes],
+                                 line_index: Dict[bytes, List[int]],
+                                 context_lines: Sequence[bytes]) -> int:
+        """Find where to apply a hunk by matching context, using a line index.
+        
+        Only the positions where the context line occurring least often in
+        the file lines up are checked.
+        
+        Args:
+            stripped: File lines, stripped of surrounding whitespace.
+            line_index: Map of stripped line to the ascending indices it
+                occurs at.
+            context_lines: The hunk's stripped original lines to match.
+            
+        Returns:
+            Index where hunk should be applied or -1 if not found.
+        """
         if not context_lines:
             return -1
         
-        # Try to find matching context
-        for i in range(len(lines) - len(context_lines) + 1):
-            match = True
-            for j, ctx_line in enumerate(context_lines):
-                if lines[i + j].strip() != ctx_line.strip():
-                    match = False
-                    break
-            if match:
+        # Anchor the search on the rarest context line; a line missing
+        # from the file rules out any match
+        anchor = -1
+        candidates: List[int] = []
+        for j, ctx_line in enumerate(context_lines):
+            positions = line_index.get(ctx_line)
+            if positions is None:
+                return -1
+            if anchor == -1 or len(positions) < len(candidates):
+                anchor = j
+                candidates = positions
+        
+        ctx = list(context_lines)
+        last_start = len(stripped) - len(ctx)
+        for pos in candidates:
+            i = pos - anchor
+            if i > last_start:
+                break
+            if i >= 0 and stripped[i:i + len(ctx)] == ctx:
                 return i
         
         return -1
@@ -414,14 +672,21 @@ class PatchApplier:
             True if successful, False otherwise.
         """
         try:
-            # Create directories if needed
-            dir_path = os.path.dirname(file_path)
-            if dir_path and not os.path.exists(dir_path):
-                os.makedirs(dir_path)
+            data = '\n'.join(content).encode('utf-8')
+            
+            # Create directories only when the file cannot be opened without them
+            try:
+                f = open(file_path, 'wb')
+            except FileNotFoundError:
+                dir_path = os.path.dirname(file_path)
+                if not dir_path:
+                    raise
+                os.makedirs(dir_path, exist_ok=True)
+                f = open(file_path, 'wb')
             
             # Write content to new file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(content))
+            with f:
+                f.write(data)
             
             return True
         except Exception:
@@ -437,9 +702,8 @@ class PatchApplier:
             True if successful, False otherwise.
         """
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                return True
-            return False
+            os.remove(file_path)
+            return True
         except Exception:
+            # Including FileNotFoundError for a missing file
             return False
\ No newline at end of file
@@ -1,7 +1,6 @@
 """Test suite for V4A-Compatible patch applier."""
 
 import os
-import shutil
 import tempfile
 import unittest
 from typing import List, Tuple
@@ -12,16 +11,20 @@ from diff_match_patch.patch_applier import PatchApplier
 class TestPatchApplier(unittest.TestCase):
     """Test cases for PatchApplier class."""
     
+    @classmethod
+    def setUpClass(cls):
+        """Set up the applier shared by all tests; it keeps no state."""
+        cls.applier = PatchApplier()
+    
     def setUp(self):
         """Set up test fixtures."""
-        self.applier = PatchApplier()
-        self.temp_dir = tempfile.mkdtemp()
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.temp_dir = self._temp_dir.name
     
     def tearDown(self):
         """Clean up test fixtures."""
         # Clean up temp directory
-        if os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
+        self._temp_dir.cleanup()
     
     def test_parse_patch_empty(self):
         """Test parsing empty patch."""
@@ -110,6 +113,41 @@ class TestPatchApplier(unittest.TestCase):
         self.assertEqual(blocks[0]['hunks'], [])
         self.assertEqual(blocks[0]['content'], [])
     
+    def test_parse_patch_attribute_access(self):
+        """Test that parsed blocks and hunks expose their fields as attributes."""
+        patch_text = """*** Begin Patch
+*** Update File: test.py
+@@ def hello():
+ context1
+-old_line
++new_line
+*** End Patch"""
+        
+        blocks = self.applier.parse_patch(patch_text)
+        self.assertEqual(blocks[0].action, 'Update')
+        self.assertEqual(blocks[0].file_path, 'test.py')
+        
+        hunk = blocks[0].hunks[0]
+        self.assertEqual(hunk.header, 'def hello():')
+        self.assertEqual(hunk.lines, hunk['lines'])
+        with self.assertRaises(KeyError):
+            blocks[0]['end_index']
+    
+    def test_parse_patch_repeated_text(self):
+        """Test that reparsing the same text returns independent blocks."""
+        patch_text = """*** Begin Patch
+*** Add File: new_file.py
++line1
++line2
+*** End Patch"""
+        
+        first = self.applier.parse_patch(patch_text)
+        first[0]['content'].append('line3')
+        
+        second = self.applier.parse_patch(patch_text)
+        self.assertIsNot(first[0], second[0])
+        self.assertEqual(second[0]['content'], ['line1', 'line2'])
+    
     def test_parse_patch_multiple_blocks(self):
         """Test parsing multiple patch blocks."""
         patch_text = """*** Begin Patch
@@ -328,6 +366,118 @@ def func2():
         self.assertNotIn('old1', updated_content)
         self.assertNotIn('old2', updated_content)
     
+    def test_apply_patch_update_directory(self):
+        """Test that updating a directory reports a failed update."""
+        os.mkdir(os.path.join(self.temp_dir, 'subdir'))
+        
+        patch_text = """*** Begin Patch
+*** Update File: subdir
+@@ line1
+-line1
++line2
+*** End Patch"""
+        
+        results = self.applier.apply_patch(patch_text, self.temp_dir)
+        self.assertEqual(results, [('subdir', False, 'Failed to apply update')])
+    
+    def test_apply_patch_preserves_line_endings(self):
+        """Test that CRLF line endings survive an update."""
+        test_file = os.path.join(self.temp_dir, 'crlf.txt')
+        with open(test_file, 'wb') as f:
+            f.write(b"line1\r\nold_line\r\nline3")
+        
+        patch_text = """*** Begin Patch
+*** Update File: crlf.txt
+@@ line1
+ line1
+-old_line
++new_line
+ line3
+*** End Patch"""
+        
+        results = self.applier.apply_patch(patch_text, self.temp_dir)
+        self.assertTrue(results[0][1])
+        
+        with open(test_file, 'rb') as f:
+            updated_content = f.read()
+        
+        self.assertEqual(updated_content, b"line1\r\nnew_line\r\nline3")
+    
+    def test_apply_patch_crlf_patch_to_crlf_file(self):
+        """Test that a patch with CRLF line endings keeps a CRLF file intact."""
+        test_file = os.path.join(self.temp_dir, 'crlf.txt')
+        with open(test_file, 'wb') as f:
+            f.write(b"a\r\nb\r\nc\r\n")
+        
+        patch_text = '\r\n'.join([
+            '*** Begin Patch',
+            '*** Update File: crlf.txt',
+            '@@ a',
+            ' a',
+            '-b',
+            '+B',
+            ' c',
+            '*** End Patch',
+        ])
+        
+        results = self.applier.apply_patch(patch_text, self.temp_dir)
+        self.assertTrue(results[0][1])
+        
+        with open(test_file, 'rb') as f:
+            updated_content = f.read()
+        
+        self.assertEqual(updated_content, b"a\r\nB\r\nc\r\n")
+    
+    def test_apply_patch_append_after_last_line_break(self):
+        """Test that a bare hunk header matches the empty line after the last line break."""
+        test_file = os.path.join(self.temp_dir, 'append.txt')
+        with open(test_file, 'wb') as f:
+            f.write(b"x\n")
+        
+        patch_text = """*** Begin Patch
+*** Update File: append.txt
+@@
++hello
+*** End Patch"""
+        
+        results = self.applier.apply_patch(patch_text, self.temp_dir)
+        self.assertTrue(results[0][1])
+        
+        with open(test_file, 'rb') as f:
+            updated_content = f.read()
+        
+        self.assertEqual(updated_content, b"x\n\nhello")
+    
+    def test_apply_patch_repeated_update_blocks(self):
+        """Test applying several Update blocks to the same file."""
+        test_file = os.path.join(self.temp_dir, 'repeat.txt')
+        with open(test_file, 'w', encoding='utf-8') as f:
+            f.write("line1\nline2\nline3\nline4")
+        
+        patch_text = """*** Begin Patch
+*** Update File: repeat.txt
+@@ line1
+-line2
++second
+*** End Patch
+
+*** Begin Patch
+*** Update File: repeat.txt
+@@ line3
+-line4
++fourth
+*** End Patch"""
+        
+        results = self.applier.apply_patch(patch_text, self.temp_dir)
+        self.assertEqual(len(results), 2)
+        self.assertTrue(results[0][1])
+        self.assertTrue(results[1][1])
+        
+        with open(test_file, 'r', encoding='utf-8') as f:
+            updated_content = f.read()
+        
+        self.assertEqual(updated_content, "line1\nsecond\nline3\nfourth")
+    
     def test_apply_patch_with_context_matching(self):
         """Test context matching in patch application."""
         # Create test file
@@ -372,6 +522,58 @@ footer"""
         self.assertEqual(lines[4], 'modified_line')
         self.assertEqual(lines[8], 'footer')
     
+    def test_apply_patch_multiple_hunks_by_context(self):
+        """Test applying several hunks whose headers are not in the file."""
+        test_file = os.path.join(self.temp_dir, 'context.txt')
+        with open(test_file, 'w', encoding='utf-8') as f:
+            f.write("alpha\nbeta\ngamma\ndelta\nepsilon\n")
+        
+        patch_text = """*** Begin Patch
+*** Update File: context.txt
+@@ def first():
+ alpha
+-beta
++BETA
+@@ def second():
+ delta
+-epsilon
++EPSILON
+*** End Patch"""
+        
+        results = self.applier.apply_patch(patch_text, self.temp_dir)
+        self.assertTrue(results[0][1])
+        
+        with open(test_file, 'r', encoding='utf-8') as f:
+            updated_content = f.read()
+        
+        self.assertEqual(updated_content, "alpha\nBETA\ngamma\ndelta\nEPSILON\n")
+    
+    def test_apply_patch_context_with_repeated_first_line(self):
+        """Test context matching when the first context line occurs many times."""
+        test_file = os.path.join(self.temp_dir, 'context.txt')
+        with open(test_file, 'w', encoding='utf-8') as f:
+            f.write("start\npass\none\npass\ntwo\npass\nthree\n")
+        
+        patch_text = """*** Begin Patch
+*** Update File: context.txt
+@@ start
+ start
+-pass
++first
+@@ def missing():
+ pass
+-three
++THREE
+*** End Patch"""
+        
+        results = self.applier.apply_patch(patch_text, self.temp_dir)
+        self.assertTrue(results[0][1])
+        
+        with open(test_file, 'r', encoding='utf-8') as f:
+            updated_content = f.read()
+        
+        self.assertEqual(updated_content, "start\nfirst\none\npass\ntwo\npass\nTHREE\n")
+    
     def test_apply_patch_invalid_format(self):
         """Test handling of invalid patch format."""
         # Missing Begin Patch